@@ -1,23 +1,32 @@
 import os
 import zipfile
+import hashlib
+import zlib
 import requests
 import numpy as np
 import math
-import heapq
 import json
 import pandas as pd
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask.json.provider import JSONProvider
 from numba import njit
+from scipy import ndimage
+from scipy.spatial import cKDTree
 from scipy.interpolate import splprep, splev
 import geopandas as gpd
-from shapely.geometry import Point, Polygon
-from shapely.prepared import prep
+import shapely
+
+try:
+    # Scanline rasterization for the land mask (optional dependency: rasterio)
+    from rasterio import features as rio_features
+    from rasterio.transform import from_origin
+except Exception:
+    rio_features = None
 
 from simulator.marinetime_data import simulate_maritime_data
 from explainer.explain import get_path_explanation
-from ports import find_nearest_port
+from ports import find_nearest_port, haversine_vec
 
 # --- Setup and Configuration ---
 
@@ -46,6 +55,13 @@ SPEED_SCALING = {"passenger ship": 20, "cargo ship": 15, "tanker": 10}
 LAND_CACHE_FILE = 'land_polygons.pkl'
 GRID_RESOLUTION = 0.5  # Use a coarser grid for global scale
 
+# The global grid is fixed, so its axes and per-row trig are computed once
+LON_AXIS = np.arange(-180, 180.1, GRID_RESOLUTION)
+LAT_AXIS = np.arange(-90, 90.1, GRID_RESOLUTION)
+NUM_LON, NUM_LAT = len(LON_AXIS), len(LAT_AXIS)
+LON_RAD, LAT_RAD = np.radians(LON_AXIS), np.radians(LAT_AXIS)
+COS_LAT = np.cos(LAT_RAD)
+
 # --- Geospatial Data Handling ---
 
 def download_and_prepare_land_data():
@@ -84,35 +100,70 @@ def download_and_prepare_land_data():
 
 # Load land data on startup
 land_geometries = download_and_prepare_land_data()
-prepared_land_polygons = [prep(geom) for geom in land_geometries.geometry]
 
 def create_land_mask(lon, lat):
-    """Creates a land mask from the prepared GeoPandas geometries."""
+    """Creates a land mask, burning the polygons onto the grid when rasterio is available."""
+    if rio_features is None:
+        return create_land_mask_shapely(lon, lat)
+
+    lon, lat = np.asarray(lon), np.asarray(lat)
+    # Pixel centres sit on the grid nodes; raster rows run north to south
+    transform = from_origin(lon[0] - GRID_RESOLUTION / 2, lat[-1] + GRID_RESOLUTION / 2, GRID_RESOLUTION, GRID_RESOLUTION)
+    mask = rio_features.rasterize(
+        ((geom, 1) for geom in land_geometries.geometry),
+        out_shape=(len(lat), len(lon)), transform=transform, fill=0, dtype='uint8')
+    return np.flipud(mask).astype(bool)
+
+def create_land_mask_shapely(lon, lat):
+    """Creates a land mask by testing grid points against each polygon in bulk."""
+    lon, lat = np.asarray(lon), np.asarray(lat)
     mask = np.zeros((len(lat), len(lon)), dtype=bool)
-    for j, lat_val in enumerate(lat):
-        for i, lon_val in enumerate(lon):
-            point = Point(lon_val, lat_val)
-            for prep_geom in prepared_land_polygons:
-                if prep_geom.contains(point):
-                    mask[j, i] = True
-                    break
+    geoms = np.asarray(land_geometries.geometry)
+    bounds = shapely.bounds(geoms)
+    shapely.prepare(geoms)
+
+    # Only test the grid window covered by each polygon's bounding box
+    i0s, i1s = np.searchsorted(lon, bounds[:, 0], 'left'), np.searchsorted(lon, bounds[:, 2], 'right')
+    j0s, j1s = np.searchsorted(lat, bounds[:, 1], 'left'), np.searchsorted(lat, bounds[:, 3], 'right')
+    for geom, i0, i1, j0, j1 in zip(geoms, i0s, i1s, j0s, j1s):
+        if i0 >= i1 or j0 >= j1: continue
+        LON, LAT = np.meshgrid(lon[i0:i1], lat[j0:j1])
+        mask[j0:j1, i0:i1] |= shapely.contains_xy(geom, LON, LAT)
     return mask
 
+def load_land_mask():
+    """Loads the global land mask from disk, building and caching it on first use."""
+    # Invalidate the cache whenever the grid resolution, the land data or the mask builder changes
+    # (the rasterio and shapely builders can disagree on cells lying on polygon edges)
+    builder = 'rasterio' if rio_features is not None else 'shapely'
+    land_key = f"{GRID_RESOLUTION}:{builder}:{shapely.length(np.asarray(land_geometries.geometry)).sum():.6f}"
+    digest = hashlib.sha1(land_key.encode()).hexdigest()[:12]
+    cache_file = f"land_mask_{str(GRID_RESOLUTION).replace('.', 'p')}_{digest}.npy"
+
+    if not os.path.exists(cache_file):
+        print("Creating land mask (this will happen only once)...")
+        # Write to a temporary file first so an interrupted startup never leaves a truncated cache behind
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            np.save(f, create_land_mask(LON_AXIS, LAT_AXIS))
+        os.replace(tmp_file, cache_file)
+
+    print("Loading cached land mask...")
+    return np.load(cache_file, mmap_mode='r')
+
+land_mask = load_land_mask()
+
 # --- Utility and Pathfinding Functions ---
 
-@njit
-def haversine(lon1, lat1, lon2, lat2):
-    R = 6371
-    dlon = math.radians(lon2 - lon1)
-    dlat = math.radians(lat2 - lat1)
-    a = math.sin(dlat / 2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+def nearest_axis_index(axis, value):
+    """Index of the entry of a sorted 1D axis closest to value (the lower one on ties)."""
+    k = int(np.searchsorted(axis, value))
+    if k == 0: return 0
+    if k == len(axis): return len(axis) - 1
+    return k - 1 if value - axis[k - 1] <= axis[k] - value else k
 
 def find_nearest_index(lon_array, lat_array, lon_val, lat_val):
-    lon_idx = np.abs(lon_array - lon_val).argmin()
-    lat_idx = np.abs(lat_array - lat_val).argmin()
-    return int(lon_idx), int(lat_idx)
+    return nearest_axis_index(lon_array, lon_val), nearest_axis_index(lat_array, lat_val)
 
 def smooth_path(path_points, num_points=100):
     if len(path_points) < 4: return path_points
@@ -125,50 +176,140 @@ def smooth_path(path_points, num_points=100):
     smoothed[0], smoothed[-1] = path_points[0], path_points[-1]
     return smoothed.tolist()
 
-def find_nearest_water_node(start_i, start_j, land_mask, num_lon, num_lat):
+def unit_sphere_xyz(lon_deg, lat_deg):
+    """Projects lon/lat (degrees) onto the 3D unit sphere, where chord distance orders like great-circle distance."""
+    lon_r, lat_r = np.radians(lon_deg), np.radians(lat_deg)
+    return np.stack([np.cos(lat_r) * np.cos(lon_r), np.cos(lat_r) * np.sin(lon_r), np.sin(lat_r)], axis=-1)
+
+def build_water_index(land_mask, lon, lat):
+    """Builds a KD-tree over the water cells of the grid for nearest-water lookups."""
+    water_j, water_i = np.nonzero(~np.asarray(land_mask))
+    return cKDTree(unit_sphere_xyz(lon[water_i], lat[water_j])), water_i, water_j
+
+def find_nearest_water_node(start_i, start_j, land_mask, lon, lat, water_index):
+    """Returns the (i, j) of the water cell nearest to a grid node; `water_index` must come from the same land_mask."""
     if not land_mask[start_j, start_i]: return start_i, start_j
-    search_radius = 1
-    while search_radius < max(num_lon, num_lat):
-        for i in range(start_i - search_radius, start_i + search_radius + 1):
-            for j in range(start_j - search_radius, start_j + search_radius + 1):
-                if 0 <= i < num_lon and 0 <= j < num_lat and not land_mask[j, i]:
-                    return i, j
-        search_radius += 1
-    return None # No water node found
-
-def a_star(start, end, lon, lat, land_mask, speed, swh, ws):
-    num_lon, num_lat = len(lon), len(lat)
-    start_lon, start_lat = lon[start[0]], lat[start[1]]
-    end_lon, end_lat = lon[end[0]], lat[end[1]]
-
-    open_set = [(0, start)]
-    came_from, g_score = {}, { (i, j): np.inf for i in range(num_lon) for j in range(num_lat) }
-    g_score[start] = 0
-    f_score = {start: haversine(start_lon, start_lat, end_lon, end_lat)}
+    water_tree, water_i, water_j = water_index
+    _, k = water_tree.query(unit_sphere_xyz(lon[start_i], lat[start_j]))
+    return int(water_i[k]), int(water_j[k])
+
+# (di, dj) offsets of the 8 grid neighbours
+NEIGHBOR_OFFSETS = np.array([(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)], dtype=np.int32)
+
+@njit(cache=True, fastmath=True)
+def haversine_rad(lon1, lat1, cos_lat1, lon2, lat2, cos_lat2):
+    """Haversine distance (km) for coordinates already in radians, with cos(lat) precomputed."""
+    a = math.sin((lat2 - lat1) / 2)**2 + cos_lat1 * cos_lat2 * math.sin((lon2 - lon1) / 2)**2
+    return 2 * 6371 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+@njit(cache=True)
+def neighbor_step_distances(lon_rad, lat_rad, cos_lat):
+    """Distance (km) of each of the 8 neighbour steps from every grid row, as a (num_lat, 8) table.
+
+    Longitudes are evenly spaced, so a step's length depends only on its row and direction.
+    """
+    num_lat = len(lat_rad)
+    dlon = lon_rad[1] - lon_rad[0]
+    step_dist = np.full((num_lat, NEIGHBOR_OFFSETS.shape[0]), np.inf, dtype=np.float32)
+    for j in range(num_lat):
+        for k in range(NEIGHBOR_OFFSETS.shape[0]):
+            nj = j + NEIGHBOR_OFFSETS[k, 1]
+            if 0 <= nj < num_lat:
+                step_dist[j, k] = haversine_rad(0.0, lat_rad[j], cos_lat[j], NEIGHBOR_OFFSETS[k, 0] * dlon, lat_rad[nj], cos_lat[nj])
+    return step_dist
+
+@njit(cache=True)
+def heap_push(keys, items, size, key, item):
+    """Pushes onto a binary min-heap stored in two arrays, growing them when full."""
+    if size == len(keys):
+        new_keys, new_items = np.empty(2 * size, keys.dtype), np.empty(2 * size, items.dtype)
+        new_keys[:size], new_items[:size] = keys, items
+        keys, items = new_keys, new_items
+    pos = size
+    while pos > 0:
+        parent = (pos - 1) >> 1
+        if keys[parent] <= key: break
+        keys[pos], items[pos] = keys[parent], items[parent]
+        pos = parent
+    keys[pos], items[pos] = key, item
+    return keys, items, size + 1
+
+@njit(cache=True)
+def heap_pop(keys, items, size):
+    """Pops the smallest item from a binary min-heap stored in two arrays."""
+    top = items[0]
+    size -= 1
+    key, item = keys[size], items[size]
+    pos = 0
+    while True:
+        child = 2 * pos + 1
+        if child >= size: break
+        if child + 1 < size and keys[child + 1] < keys[child]: child += 1
+        if keys[child] >= key: break
+        keys[pos], items[pos] = keys[child], items[child]
+        pos = child
+    keys[pos], items[pos] = key, item
+    return top, size
+
+@njit(cache=True)
+def a_star_search(start, end, lon_rad, lat_rad, cos_lat, land_mask, step_dist, cost_grid):
+    """A* over flat node indices (j * num_lon + i). Returns the path as node indices, empty if none.
+
+    Edge costs vary per cell with the weather, so uniform-grid symmetry pruning such as
+    Jump Point Search would change the routes found and is not applied here.
+    """
+    num_lat, num_lon = land_mask.shape
+    num_nodes = num_lat * num_lon
+    end_i, end_j = end % num_lon, end // num_lon
+
+    g_score = np.full(num_nodes, np.inf, dtype=np.float32)
+    came_from = np.full(num_nodes, -1, dtype=np.int32)
+    closed = np.zeros(num_nodes, dtype=np.bool_)
 
-    while open_set:
-        _, current = heapq.heappop(open_set)
+    g_score[start] = 0
+    heap_keys, heap_items = np.empty(1024, dtype=np.float32), np.empty(1024, dtype=np.int32)
+    heap_keys, heap_items, heap_size = heap_push(heap_keys, heap_items, 0, np.float32(0), np.int32(start))
+
+    while heap_size > 0:
+        current, heap_size = heap_pop(heap_keys, heap_items, heap_size)
+        # Improved nodes are pushed again rather than updated, so skip stale entries
+        if closed[current]: continue
+        closed[current] = True
         if current == end:
-            path = []
-            while current in came_from: path.append(current); current = came_from[current]
-            path.append(start)
-            return path[::-1]
-
-        i, j = current
-        for di, dj in [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            ni, nj = i + di, j + dj
-            if 0 <= ni < num_lon and 0 <= nj < num_lat and not land_mask[nj, ni]:
-                neighbor = (ni, nj)
-                base_dist = haversine(lon[i], lat[j], lon[ni], lat[nj])
-                weather_factor = 1 + (0.1 * swh[nj, ni]) + (0.05 * ws[nj, ni])
-                cost = base_dist * weather_factor
-                tentative_g_score = g_score[current] + cost / speed
-                if tentative_g_score < g_score.get(neighbor, np.inf):
-                    came_from[neighbor], g_score[neighbor] = current, tentative_g_score
-                    f_score[neighbor] = tentative_g_score + haversine(lon[ni], lat[nj], end_lon, end_lat)
-                    if neighbor not in [item[1] for item in open_set]:
-                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
-    return None
+            length = 1
+            while came_from[current] != -1: current = came_from[current]; length += 1
+            path = np.empty(length, dtype=np.int32)
+            current = end
+            for k in range(length - 1, -1, -1): path[k] = current; current = came_from[current]
+            return path
+
+        i, j = current % num_lon, current // num_lon
+        for k in range(NEIGHBOR_OFFSETS.shape[0]):
+            ni, nj = i + NEIGHBOR_OFFSETS[k, 0], j + NEIGHBOR_OFFSETS[k, 1]
+            if ni < 0 or ni >= num_lon or nj < 0 or nj >= num_lat or land_mask[nj, ni]: continue
+            neighbor = nj * num_lon + ni
+            if closed[neighbor]: continue
+            tentative_g_score = g_score[current] + step_dist[j, k] * cost_grid[nj, ni]
+            if tentative_g_score < g_score[neighbor]:
+                came_from[neighbor], g_score[neighbor] = current, tentative_g_score
+                h = haversine_rad(lon_rad[ni], lat_rad[nj], cos_lat[nj], lon_rad[end_i], lat_rad[end_j], cos_lat[end_j])
+                heap_keys, heap_items, heap_size = heap_push(heap_keys, heap_items, heap_size, np.float32(tentative_g_score + h), np.int32(neighbor))
+    return np.empty(0, dtype=np.int32)
+
+GRID_STEP_DIST = neighbor_step_distances(LON_RAD, LAT_RAD, COS_LAT)
+
+def a_star(start, end, land_mask, speed, swh, ws):
+    """A* between (i, j) nodes of the global grid. Returns the path as (i, j) tuples, or None."""
+    # Per-cell cost of travelling 1 km: weather factor over ship speed
+    cost_grid = ((1 + (0.1 * swh) + (0.05 * ws)) / speed).astype(np.float32, copy=False)
+    path = a_star_search(start[1] * NUM_LON + start[0], end[1] * NUM_LON + end[0], LON_RAD, LAT_RAD, COS_LAT,
+                         np.asarray(land_mask), GRID_STEP_DIST, cost_grid)
+    if len(path) == 0: return None
+    return [(int(k % NUM_LON), int(k // NUM_LON)) for k in path]
+
+# 8-connected water regions, so routes between disconnected seas are rejected without a search
+water_labels = ndimage.label(~land_mask, structure=np.ones((3, 3)))[0].astype(np.int32)
+water_index = build_water_index(land_mask, LON_AXIS, LAT_AXIS)
 
 # --- Flask Route ---
 @app.route('/optimize_route', methods=['POST'])
@@ -179,28 +320,25 @@ def optimize_route():
     if not all([ship_type, start_port, end_port, departure_date]): return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        # Define the grid for the entire world
-        lon = np.arange(-180, 180.1, GRID_RESOLUTION)
-        lat = np.arange(-90, 90.1, GRID_RESOLUTION)
+        # The grid for the entire world
+        lon, lat = LON_AXIS, LAT_AXIS
         
         print("Generating maritime data...")
-        maritime_data = simulate_maritime_data(lon, lat)
-        
-        print("Creating land mask...")
-        land_mask = create_land_mask(lon, lat)
+        # Seed by departure day so repeated queries for the same date share (cached) conditions
+        maritime_data = simulate_maritime_data(lon, lat, seed=zlib.crc32(str(departure_date)[:10].encode()))
         
         start_i, start_j = find_nearest_index(lon, lat, start_port[0], start_port[1])
         end_i, end_j = find_nearest_index(lon, lat, end_port[0], end_port[1])
 
         print("Finding nearest water nodes...")
-        valid_start = find_nearest_water_node(start_i, start_j, land_mask, len(lon), len(lat))
-        valid_end = find_nearest_water_node(end_i, end_j, land_mask, len(lon), len(lat))
+        valid_start = find_nearest_water_node(start_i, start_j, land_mask, lon, lat, water_index)
+        valid_end = find_nearest_water_node(end_i, end_j, land_mask, lon, lat, water_index)
 
-        if not valid_start or not valid_end:
-            return jsonify({"error": "Start or end point is on land. Please select points in the water."}), 400
+        if water_labels[valid_start[1], valid_start[0]] != water_labels[valid_end[1], valid_end[0]]:
+            return jsonify({"error": "No viable route found. The destination may be unreachable."}), 404
 
         print("Calculating optimal route with A*...")
-        path = a_star(valid_start, valid_end, lon, lat, land_mask, SPEED_SCALING[ship_type.lower()], maritime_data['swh'], maritime_data['ws'])
+        path = a_star(valid_start, valid_end, land_mask, SPEED_SCALING[ship_type.lower()], maritime_data['swh'], maritime_data['ws'])
 
         if not path: return jsonify({"error": "No viable route found. The destination may be unreachable."}), 404
         
@@ -209,7 +347,8 @@ def optimize_route():
         final_path_points = [start_port] + (path_coords[1:-1] if len(path_coords) > 2 else []) + [end_port]
         smoothed_path = smooth_path(final_path_points)
         
-        total_distance = sum(haversine(p1[0], p1[1], p2[0], p2[1]) for p1, p2 in zip(smoothed_path, smoothed_path[1:]))
+        points = np.asarray(smoothed_path, dtype=float)
+        total_distance = float(haversine_vec(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1]).sum())
         route_data = {"distance": total_distance, "num_steps": len(smoothed_path), "start_port": start_port, "end_port": end_port}
         maritime_data_summary = {k: v for k, v in maritime_data.items() if isinstance(v, (int, float, bool))}
 
@@ -2,11 +2,12 @@ import json
 import os
 import math
 import csv
+import numpy as np
 from typing import Dict, Tuple, Any, List, Optional
 
 try:
     # KD-tree for fast nearest neighbor (optional dependency: scipy)
-    from scipy.spatial import ckdtree
+    from scipy.spatial import cKDTree
 except Exception:
     cKDTree = None
 
@@ -26,15 +27,26 @@ def _haversine_km(lon1, lat1, lon2, lat2) -> float:
     return R * c
 
 
+def haversine_vec(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """Haversine distance (km) evaluated element-wise over NumPy arrays."""
+    R = 6371.0
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1)/2.0)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2 - lon1)/2.0)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return R * c
+
+
 class PortsIndex:
     """Loads ports from either the small bundled JSON or a full CSV and
-    provides a nearest-neighbor lookup. If a full CSV is present and SciPy
-    is available, a KD-tree is used for fast queries.
+    provides a nearest-neighbor lookup. If SciPy is available, a KD-tree is
+    built on the first query and used for fast lookups.
     """
     def __init__(self):
         self.ports: List[Dict[str, Any]] = []
-        self._tree: Optional[ckdtree] = None
+        self._tree: Optional[cKDTree] = None
         self._coords = None
+        self._lats = np.empty(0)
+        self._lons = np.empty(0)
         self._load()
 
     def _load(self):
@@ -44,19 +56,20 @@ class PortsIndex:
             with open(PORTS_JSON, 'r', encoding='utf-8') as f:
                 self.ports = json.load(f)
 
-        # Build KD-tree if possible
-        if cKDTree and len(self.ports) > 0:
+        count = len(self.ports)
+        self._lats = np.fromiter((float(p['lat']) for p in self.ports), float, count=count)
+        self._lons = np.fromiter((float(p['lon']) for p in self.ports), float, count=count)
+
+    def _ensure_tree(self) -> Optional[cKDTree]:
+        # Build KD-tree lazily, if possible
+        if self._tree is None and cKDTree and len(self.ports) > 0:
             # Use (lat, lon) in radians projected to 3D unit sphere for good spherical NN
-            coords = []
-            for p in self.ports:
-                lat_r = math.radians(float(p['lat']))
-                lon_r = math.radians(float(p['lon']))
-                x = math.cos(lat_r) * math.cos(lon_r)
-                y = math.cos(lat_r) * math.sin(lon_r)
-                z = math.sin(lat_r)
-                coords.append((x, y, z))
+            lats, lons = np.radians(self._lats), np.radians(self._lons)
+            coords = np.column_stack([np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)])
             self._coords = coords
-            self._tree = cKDTree(coords)
+            # Skipping median balancing and node compaction makes the build faster
+            self._tree = cKDTree(coords, balanced_tree=False, compact_nodes=False)
+        return self._tree
 
     @staticmethod
     def _load_from_csv(path: str) -> List[Dict[str, Any]]:
@@ -83,15 +96,12 @@ class PortsIndex:
         if not self.ports:
             raise RuntimeError('No ports available')
 
-        if self._tree is None:
-            # fallback to linear scan
-            best = None
-            best_dist = float('inf')
-            for p in self.ports:
-                d = _haversine_km(lon, lat, p['lon'], p['lat'])
-                if d < best_dist:
-                    best_dist = d
-                    best = p
+        if self._ensure_tree() is None:
+            # fallback to linear scan, vectorized over all ports
+            dists = haversine_vec(lon, lat, self._lons, self._lats)
+            k = int(dists.argmin())
+            best = self.ports[k]
+            best_dist = float(dists[k])
             return {
                 'name': best['name'],
                 'country': best.get('country'),
@@ -1,4 +1,46 @@
+import threading
+
 import numpy as np
+from numba import njit
+
+# Recent seeded realizations, keyed by (seed, grid); oldest entries are evicted first.
+# Flask serves requests on several threads, so all access goes through the lock.
+_MARITIME_CACHE: dict = {}
+_MARITIME_CACHE_SIZE = 4
+_MARITIME_CACHE_LOCK = threading.Lock()
+
+
+@njit(fastmath=True, cache=True)
+def _accumulate_patches(field, lat_factor, lon_factor):
+    """Adds sum_p lat_factor[p, j] * lon_factor[p, i] to field[j, i] in place."""
+    for j in range(field.shape[0]):
+        for p in range(lat_factor.shape[0]):
+            weight = lat_factor[p, j]
+            for i in range(field.shape[1]):
+                field[j, i] += weight * lon_factor[p, i]
+
+
+def _add_gaussian_patches(field, rng, grid_lon, grid_lat, num_patches, amp_range, max_sigma_frac, lon_span, lat_span):
+    """
+    Adds `num_patches` random axis-aligned Gaussian bumps to `field` in place.
+
+    Each bump separates into a longitude factor times a latitude factor, so
+    only O(P * (num_lon + num_lat)) exponentials are evaluated and no
+    full-grid temporaries are created.
+    """
+    lon = np.asarray(grid_lon, dtype=np.float32)
+    lat = np.asarray(grid_lat, dtype=np.float32)
+    cx, cy, amp, sigma_lon, sigma_lat = np.empty((5, num_patches), dtype=np.float32)
+    for p in range(num_patches):
+        cx[p] = rng.uniform(np.min(grid_lon), np.max(grid_lon))
+        cy[p] = rng.uniform(np.min(grid_lat), np.max(grid_lat))
+        amp[p] = rng.uniform(*amp_range)
+        sigma_lon[p] = rng.uniform(0.05 * lon_span, max_sigma_frac * lon_span)
+        sigma_lat[p] = rng.uniform(0.05 * lat_span, max_sigma_frac * lat_span)
+
+    lon_factor = np.exp(-((lon[None, :] - cx[:, None]) ** 2) / (2 * sigma_lon[:, None] ** 2))
+    lat_factor = amp[:, None] * np.exp(-((lat[None, :] - cy[:, None]) ** 2) / (2 * sigma_lat[:, None] ** 2))
+    _accumulate_patches(field, lat_factor, lon_factor)
 
 
 def simulate_maritime_data(grid_lon, grid_lat, seed: int | None = None):
@@ -12,7 +54,10 @@ def simulate_maritime_data(grid_lon, grid_lat, seed: int | None = None):
 
     The function uses spatially-varying random fields (Gaussian bumps + base
     background) so each call returns a different (but realistic-looking)
-    pattern. Pass a `seed` to reproduce a specific realization.
+    pattern. Pass a `seed` to reproduce a specific realization; seeded
+    results are cached for the last few (seed, grid) pairs, so their
+    arrays are shared between callers and marked read-only (each caller
+    gets its own copy of the returned dict).
 
     Args:
         grid_lon (sequence): 1D array-like of longitudes (degrees).
@@ -20,50 +65,64 @@ def simulate_maritime_data(grid_lon, grid_lat, seed: int | None = None):
         seed (int|None): Optional RNG seed for reproducibility.
 
     Returns:
-        dict: keys match what the backend expects (arrays are shaped
+        dict: keys match what the backend expects (float32 arrays shaped
               (len(grid_lat), len(grid_lon))). Summary statistics are
               included for the explanation module.
     """
+    if seed is None:
+        return _generate_maritime_data(grid_lon, grid_lat, seed)
+
+    key = (seed, len(grid_lon), len(grid_lat), float(grid_lon[0]), float(grid_lon[-1]), float(grid_lat[0]), float(grid_lat[-1]))
+    with _MARITIME_CACHE_LOCK:
+        data = _MARITIME_CACHE.pop(key, None)
+        if data is not None:
+            _MARITIME_CACHE[key] = data  # move to the most-recent end
+
+    if data is None:
+        # Build outside the lock so slow generations don't serialize requests
+        data = _generate_maritime_data(grid_lon, grid_lat, seed)
+        for value in data.values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        with _MARITIME_CACHE_LOCK:
+            # If another thread built the same key meanwhile, keep its copy
+            data = _MARITIME_CACHE[key] = _MARITIME_CACHE.pop(key, data)
+            while len(_MARITIME_CACHE) > _MARITIME_CACHE_SIZE:
+                _MARITIME_CACHE.pop(next(iter(_MARITIME_CACHE)), None)
+
+    # Shallow copy so callers can't add or replace keys in the shared entry
+    return dict(data)
+
+
+def _generate_maritime_data(grid_lon, grid_lat, seed):
+    """Builds a fresh realization; see `simulate_maritime_data`."""
     rng = np.random.default_rng(seed)
 
     num_lon = len(grid_lon)
     num_lat = len(grid_lat)
 
     # Create coordinate matrices (lon across columns, lat across rows)
-    LON, LAT = np.meshgrid(np.asarray(grid_lon), np.asarray(grid_lat))
+    # Fields are float32: routing needs a few significant digits, not double precision
+    LON, LAT = np.meshgrid(np.asarray(grid_lon, dtype=np.float32), np.asarray(grid_lat, dtype=np.float32))
 
     # --- Significant Wave Height (meters) ---
     # Base background waves between 0.2 and 1.2 m
-    base_swh = rng.uniform(0.2, 1.2, size=(num_lat, num_lon))
+    base_swh = 0.2 + 1.0 * rng.random((num_lat, num_lon), dtype=np.float32)
     # Add a few random high-wave Gaussian patches
     num_patches = rng.integers(1, 4)
     lon_span = (np.max(grid_lon) - np.min(grid_lon)) or 1.0
     lat_span = (np.max(grid_lat) - np.min(grid_lat)) or 1.0
-    for _ in range(num_patches):
-        cx = rng.uniform(np.min(grid_lon), np.max(grid_lon))
-        cy = rng.uniform(np.min(grid_lat), np.max(grid_lat))
-        amp = rng.uniform(1.0, 3.5)  # meters above background
-        sigma_lon = rng.uniform(0.05 * lon_span, 0.25 * lon_span)
-        sigma_lat = rng.uniform(0.05 * lat_span, 0.25 * lat_span)
-        bump = amp * np.exp(-(((LON - cx) ** 2) / (2 * sigma_lon ** 2) + ((LAT - cy) ** 2) / (2 * sigma_lat ** 2)))
-        base_swh += bump
+    _add_gaussian_patches(base_swh, rng, grid_lon, grid_lat, num_patches, (1.0, 3.5), 0.25, lon_span, lat_span)  # amp in meters above background
 
-    swh = base_swh.astype(float)
+    swh = base_swh.astype(np.float32, copy=False)
 
     # --- Wind Speed (knots) ---
-    base_ws = rng.uniform(3.0, 12.0, size=(num_lat, num_lon))
+    base_ws = 3.0 + 9.0 * rng.random((num_lat, num_lon), dtype=np.float32)
     # wind patches (stronger winds)
     num_wind_patches = rng.integers(1, 4)
-    for _ in range(num_wind_patches):
-        cx = rng.uniform(np.min(grid_lon), np.max(grid_lon))
-        cy = rng.uniform(np.min(grid_lat), np.max(grid_lat))
-        amp = rng.uniform(5.0, 20.0)
-        sigma_lon = rng.uniform(0.05 * lon_span, 0.3 * lon_span)
-        sigma_lat = rng.uniform(0.05 * lat_span, 0.3 * lat_span)
-        bump = amp * np.exp(-(((LON - cx) ** 2) / (2 * sigma_lon ** 2) + ((LAT - cy) ** 2) / (2 * sigma_lat ** 2)))
-        base_ws += bump
+    _add_gaussian_patches(base_ws, rng, grid_lon, grid_lat, num_wind_patches, (5.0, 20.0), 0.3, lon_span, lat_span)
 
-    ws = base_ws.astype(float)
+    ws = base_ws.astype(np.float32, copy=False)
 
     # --- Surface Currents (knots) ---
     # Create a gently varying current field with a dominant east/west banding
@@ -74,16 +133,16 @@ def simulate_maritime_data(grid_lon, grid_lat, seed: int | None = None):
     v_surf = 0.2 * np.cos(2 * np.pi * lon_norm)  # north/south weak variation
 
     # Add small random noise/eddies
-    u_surf += rng.normal(0.0, 0.2, size=(num_lat, num_lon))
-    v_surf += rng.normal(0.0, 0.1, size=(num_lat, num_lon))
+    u_surf += 0.2 * rng.standard_normal((num_lat, num_lon), dtype=np.float32)
+    v_surf += 0.1 * rng.standard_normal((num_lat, num_lon), dtype=np.float32)
 
-    u_surf = u_surf.astype(float)
-    v_surf = v_surf.astype(float)
+    u_surf = u_surf.astype(np.float32, copy=False)
+    v_surf = v_surf.astype(np.float32, copy=False)
 
     # Summary statistics for explanations
-    avg_swh = float(np.round(np.mean(swh), 2))
-    avg_wind_speed = float(np.round(np.mean(ws), 2))
-    avg_current_speed = float(np.round(np.mean(np.sqrt(u_surf ** 2 + v_surf ** 2)), 2))
+    avg_swh = round(float(np.mean(swh)), 2)
+    avg_wind_speed = round(float(np.mean(ws)), 2)
+    avg_current_speed = round(float(np.mean(np.sqrt(u_surf ** 2 + v_surf ** 2))), 2)
     adverse_weather = bool(np.max(swh) > 3.0 or np.max(ws) > 25.0)
 
     return {